@@ -1,9 +1,12 @@
+import functools
 import os
-import json
+import pickle
 import random
 import re
-import requests
-from typing import List, Dict, Any, TypedDict
+import aiohttp
+import orjson
+from diskcache import Cache
+from typing import List, Dict, Any, Tuple, TypedDict
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
@@ -17,96 +20,204 @@ load_dotenv()
 
 # --- Configuration ---
 ANKI_CONNECT_URL = "http://127.0.0.1:8765"
+TRANSLATION_CACHE_DIR = ".trans_cache"
+DIFFICULTY_LEVELS = ("beginner", "intermediate", "advanced")
+TRANSLATION_CACHE_TTL = 30 * 24 * 60 * 60  # seconds
+_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+_MODEL_NAME = os.getenv("LLM_MODEL")
 
+# Splits a batched translation reply on '%%' and eats surrounding whitespace
+_SEGMENT_SEP_RE = re.compile(r"\s*%%\s*")
 
+
+@functools.lru_cache(maxsize=None)
 def get_translation_model():
-    """Factory to get the translation model based on environment variables."""
-    provider = os.getenv("LLM_PROVIDER", "gemini").lower()
-    model_name = os.getenv("LLM_MODEL")
+    """Factory to get the translation model based on environment variables.
 
-    if provider == "gemini":
+    The client is built once and reused for the lifetime of the process.
+    """
+    if _PROVIDER == "gemini":
         return ChatGoogleGenerativeAI(
-            model=model_name or "gemini-2.5-flash",
+            model=_MODEL_NAME or "gemini-2.5-flash",
             temperature=0.3
         )
-    elif provider == "openai":
-        return ChatOpenAI(model=model_name or "gpt-4o", temperature=0.3)
-    elif provider == "ollama":
-        return ChatOllama(model=model_name or "llama3.2:3b", temperature=0.3)
+    elif _PROVIDER == "openai":
+        return ChatOpenAI(model=_MODEL_NAME or "gpt-4o", temperature=0.3)
+    elif _PROVIDER == "ollama":
+        return ChatOllama(model=_MODEL_NAME or "llama3.2:3b", temperature=0.3)
     else:
         return ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
 
 
+@functools.lru_cache(maxsize=None)
+def _translation_cache() -> Cache:
+    """Persistent word -> translation cache, shared across runs."""
+    return Cache(TRANSLATION_CACHE_DIR)
+
+
+# --- WORD LIST CACHE ---
+
+def _word_list_path(language: str) -> str:
+    return os.path.join("data", f"{language}", "word-list-cleaned.json")
+
+
+def _pickle_path(language: str) -> str:
+    return os.path.join("data", f"{language}", "word-list.pkl")
+
+
+def _build_buckets(word_list: Dict[str, Any]) -> Dict[str, Tuple[str, ...]]:
+    """Groups a parsed word list by difficulty level in a single pass.
+
+    Shared with scripts/preprocess_wordlists.py so the pickle and JSON paths
+    always produce the same buckets.
+    """
+    buckets: Dict[str, List[str]] = {"all": [], **{level: [] for level in DIFFICULTY_LEVELS}}
+    for v in word_list.values():
+        buckets["all"].append(v["word"])
+        level = v.get("word_difficulty", "").lower()
+        if level in DIFFICULTY_LEVELS:
+            buckets[level].append(v["word"])
+    return {level: tuple(words) for level, words in buckets.items()}
+
+
+@functools.lru_cache(maxsize=16)
+def _load_buckets(language: str) -> Dict[str, Tuple[str, ...]]:
+    """
+    Returns a language's words as {"all": (...), "<difficulty>": (...)}.
+
+    Buckets are tuples since every caller shares the cached copy; random.sample
+    indexes into them directly.
+
+    Uses the pickle written by scripts/preprocess_wordlists.py when it is at
+    least as new as the JSON source, otherwise parses the JSON in one pass.
+    Raises ValueError if the language has no word list.
+    """
+    json_path = _word_list_path(language)
+
+    try:
+        json_mtime = os.path.getmtime(json_path)
+    except FileNotFoundError:
+        raise ValueError(f"File not found at {json_path}")
+
+    try:
+        pkl_path = _pickle_path(language)
+        if os.path.getmtime(pkl_path) >= json_mtime:
+            with open(pkl_path, 'rb') as f:
+                return pickle.load(f)
+    except FileNotFoundError:
+        pass
+
+    with open(json_path, 'rb') as f:
+        word_list = orjson.loads(f.read())
+
+    return _build_buckets(word_list)
+
+
 # --- TOOLS ---
 
 @tool
 def get_n_random_words(language: str, n: int) -> List[str]:
     """Selects a specified number of random words from a language-specific word list."""
     n = int(n)
-    path = os.path.join("data", f"{language}", "word-list-cleaned.json")
+    if n <= 0:
+        return []
 
-    if not os.path.exists(path):
-        return [f"Error: File not found at {path}"]
+    try:
+        buckets = _load_buckets(language)
+    except ValueError as e:
+        return [f"Error: {e}"]
 
-    with open(path, 'r', encoding='utf-8') as f:
-        word_list = json.load(f)
+    words = buckets["all"]
 
-    keys = list(word_list.keys())
-    if n > len(keys): n = len(keys)
+    if not words:
+        return [f"Error: No words found in {language}"]
 
-    random_keys = random.sample(keys, n)
-    return [word_list[k]["word"] for k in random_keys]
+    return random.sample(words, min(n, len(words)))
 
 
 @tool
 def get_n_random_words_by_difficulty_level(language: str, difficulty_level: str, n: int) -> List[str]:
     """Retrieves random words filtered by difficulty (beginner, intermediate, advanced)."""
     n = int(n)
-    path = os.path.join("data", f"{language}", "word-list-cleaned.json")
+    if n <= 0:
+        return []
 
-    if not os.path.exists(path):
-        return [f"Error: File not found at {path}"]
+    # "all" lives alongside the levels in the bucket map; only real levels are valid here
+    level = difficulty_level.lower()
+    if level not in DIFFICULTY_LEVELS:
+        return [f"Error: Unknown difficulty level {difficulty_level}, expected one of {', '.join(DIFFICULTY_LEVELS)}"]
 
-    with open(path, 'r', encoding='utf-8') as f:
-        word_list = json.load(f)
+    try:
+        buckets = _load_buckets(language)
+    except ValueError as e:
+        return [f"Error: {e}"]
 
-    filtered = {k: v for k, v in word_list.items() if v.get("word_difficulty", "").lower() == difficulty_level.lower()}
+    words = buckets[level]
 
-    if not filtered:
+    if not words:
         return [f"Error: No words found for {difficulty_level} in {language}"]
 
-    keys = list(filtered.keys())
-    if n > len(keys): n = len(keys)
+    return random.sample(words, min(n, len(words)))
+
+
+async def _translate_batch(model, words: List[str], source_language: str, target_language: str) -> List[str]:
+    """Translates words in one request, returning translations in input order."""
+    # Words go in and come back as '%%'-separated segments, which keeps the
+    # reply far shorter than a JSON object per word
+    prompt = (
+        f"Translate each segment separated by %% from {source_language} to {target_language}. "
+        f"Return ONLY the translations joined by %% in the same order.\n"
+        + " %% ".join(words)
+    )
+
+    response = await model.ainvoke([HumanMessage(content=prompt)])
+    parts = _SEGMENT_SEP_RE.split(response.text.strip())
+
+    if len(parts) != len(words):
+        # The reply couldn't be aligned with the input, so ask for each word
+        # separately; abatch sends these requests concurrently
+        prompts = [
+            [HumanMessage(content=(
+                f"Translate '{w}' from {source_language} to {target_language}. "
+                f"Reply with ONLY the translated word."
+            ))]
+            for w in words
+        ]
+        responses = await model.abatch(prompts)
+        parts = [r.text.strip() for r in responses]
 
-    random_keys = random.sample(keys, n)
-    return [filtered[k]["word"] for k in random_keys]
+    return parts
 
 
 @tool
-def translate_words(random_words: List[str], source_language: str, target_language: str) -> Dict[str, Any]:
+async def translate_words(random_words: List[str], source_language: str, target_language: str) -> Dict[str, Any]:
     """Translates a list of words. Returns a dictionary with 'translations' list."""
-    print(f"DEBUG: Translating {len(random_words)} words...")
-    model = get_translation_model()
-
-    prompt = (
-        f"Translate these {len(random_words)} words from {source_language} to {target_language}.\n"
-        f"Return ONLY valid JSON: {{ \"translations\": [ {{ \"source\": \"word\", \"target\": \"translation\" }} ] }}\n"
-        f"Words: {json.dumps(random_words, ensure_ascii=False)}"
-    )
+    # Entries are per model, so switching LLM_PROVIDER / LLM_MODEL never serves
+    # translations produced by a different model
+    key_prefix = (_PROVIDER, _MODEL_NAME, source_language.lower(), target_language.lower())
 
     try:
-        response = model.invoke([HumanMessage(content=prompt)])
-        text = response.content
-        match = re.search(r"\{.*\}", text, re.DOTALL)
-        if match:
-            return json.loads(match.group(0))
-        return {"error": "Invalid JSON response", "raw": text}
+        cache = _translation_cache()
+
+        # Keyed by unique word (first-seen order), so duplicates are only sent once
+        translated = {w: cache.get((*key_prefix, w)) for w in dict.fromkeys(random_words)}
+        missing = [w for w, t in translated.items() if t is None]
+        print(f"DEBUG: Translating {len(missing)} words ({len(translated) - len(missing)} cached)...")
+
+        if missing:
+            parts = await _translate_batch(get_translation_model(), missing, source_language, target_language)
+            for w, t in zip(missing, parts):
+                if t.strip():
+                    cache.set((*key_prefix, w), t, expire=TRANSLATION_CACHE_TTL)
+                translated[w] = t
+
+        return {"translations": [{"source": w, "target": translated[w]} for w in random_words]}
     except Exception as e:
         return {"error": str(e)}
 
 
 @tool
-def create_anki_stack(deck_name: str, cards: List[Dict[str, str]]) -> str:
+async def create_anki_stack(deck_name: str, cards: List[Dict[str, str]]) -> str:
     """
     Creates an Anki deck and adds multiple cards in ONE go.
 
@@ -116,39 +227,58 @@ def create_anki_stack(deck_name: str, cards: List[Dict[str, str]]) -> str:
     """
     print(f"DEBUG: Batch creating deck '{deck_name}' with {len(cards)} cards...")
 
-    # 1. Create Deck
+    notes = [
+        {
+            "deckName": deck_name,
+            "modelName": "Basic",
+            "fields": {
+                "Front": card.get("source", card.get("front", "")),
+                "Back": card.get("target", card.get("back", ""))
+            }
+        }
+        for card in cards
+    ]
+
+    # Create the deck and add every note in a single AnkiConnect round trip.
+    # One addNote per card (rather than addNotes) so a failing note, e.g. a
+    # duplicate on a re-run, doesn't stop the others from being added
+    payload = {
+        "action": "multi",
+        "version": 6,
+        "params": {
+            "actions": [{"action": "createDeck", "version": 6, "params": {"deck": deck_name}}]
+            + [{"action": "addNote", "version": 6, "params": {"note": note}} for note in notes]
+        }
+    }
+
     try:
-        requests.post(ANKI_CONNECT_URL, json={
-            "action": "createDeck",
-            "version": 6,
-            "params": {"deck": deck_name}
-        })
+        async with aiohttp.ClientSession() as session:
+            async with session.post(ANKI_CONNECT_URL, json=payload) as r:
+                # AnkiConnect replies with a text/json content type
+                resp = await r.json(content_type=None)
     except Exception as e:
         return f"Error connecting to Anki: {e}. Is Anki running?"
 
-    # 2. Add Cards (Local loop, super fast)
+    if resp.get("error"):
+        return f"Error from Anki: {resp['error']}"
+
+    deck_result, *note_results = resp["result"]
+    if deck_result.get("error"):
+        return f"Error creating deck '{deck_name}': {deck_result['error']}"
+
     success_count = 0
     errors = []
 
-    for card in cards:
-        payload = {
-            "action": "addNote",
-            "version": 6,
-            "params": {
-                "note": {
-                    "deckName": deck_name,
-                    "modelName": "Basic",
-                    "fields": {
-                        "Front": card.get("source", card.get("front", "")),
-                        "Back": card.get("target", card.get("back", ""))
-                    }
-                }
-            }
-        }
-        resp = requests.post(ANKI_CONNECT_URL, json=payload).json()
-        if resp.get("error"):
-            errors.append(resp["error"])
+    for note_result in note_results:
+        if note_result.get("error"):
+            errors.append(note_result["error"])
         else:
             success_count += 1
 
-    return f"Success! Created deck '{deck_name}' and added {success_count} cards. Errors: {len(errors)}"
\ No newline at end of file
+    if success_count == 0 and errors:
+        return f"Error: no cards were added to deck '{deck_name}'. Errors: {errors}"
+
+    summary = f"Success! Created deck '{deck_name}' and added {success_count} cards. Errors: {len(errors)}"
+    if errors:
+        summary += f" {errors}"
+    return summary
\ No newline at end of file
@@ -1,5 +1,6 @@
 import asyncio
 import os
+from functools import partial
 from typing import TypedDict, Optional, Annotated
 
 from dotenv import load_dotenv
@@ -38,13 +39,8 @@ tools = [
 ]
 
 
-def assistant(state: AgentState):
-    # Get the LLM using your factory
-    llm = get_translation_model()  # Reusing the factory from tools.py
-
-    llm_with_tools = llm.bind_tools(tools)
-
-    sys_msg = SystemMessage(content="""
+# Built once and reused on every assistant step
+sys_msg = SystemMessage(content="""
     You are a helpful language learning assistant.
 
     Your goal is to:
@@ -55,8 +51,10 @@ def assistant(state: AgentState):
     IMPORTANT: When creating the Anki deck, you MUST use the `create_anki_stack` tool.
     Pass the ENTIRE list of translated words to `create_anki_stack` at once.
     Do NOT create cards one by one.
-    """)
+""")
 
+
+def assistant(state: AgentState, llm_with_tools):
     return {
         "messages": [llm_with_tools.invoke([sys_msg] + state["messages"])],
         "source_language": state.get("source_language"),
@@ -68,7 +66,10 @@ def assistant(state: AgentState):
 
 async def build_graph():
     builder = StateGraph(AgentState)
-    builder.add_node("assistant", assistant)
+    # Bind the tool schemas once instead of on every assistant step
+    llm_with_tools = get_translation_model().bind_tools(tools)  # Reusing the factory from tools.py
+
+    builder.add_node("assistant", partial(assistant, llm_with_tools=llm_with_tools))
     builder.add_node("tools", ToolNode(tools))  # Use our clean tools list
     builder.add_edge(START, "assistant")
     builder.add_conditional_edges("assistant", tools_condition)
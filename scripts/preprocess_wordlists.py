@@ -0,0 +1,37 @@
+"""
+Pre-buckets every data/<language>/word-list-cleaned.json into a pickle.
+
+agent/tools.py loads data/<language>/word-list.pkl instead of the JSON file
+whenever the pickle is at least as new, which skips JSON parsing on cold start.
+
+Usage (from the repository root):
+    python -m scripts.preprocess_wordlists
+"""
+import os
+import pickle
+
+import orjson
+
+from agent.tools import _build_buckets
+
+DATA_DIR = "data"
+
+
+def main():
+    for language in sorted(os.listdir(DATA_DIR)):
+        src = os.path.join(DATA_DIR, language, "word-list-cleaned.json")
+        if not os.path.isfile(src):
+            continue
+
+        with open(src, 'rb') as f:
+            buckets = _build_buckets(orjson.loads(f.read()))
+
+        dst = os.path.join(DATA_DIR, language, "word-list.pkl")
+        with open(dst, 'wb') as f:
+            pickle.dump(buckets, f, protocol=5)
+
+        print(f"{language}: {len(buckets['all'])} words -> {dst}")
+
+
+if __name__ == "__main__":
+    main()